@@ -1,56 +1,252 @@
+import os
 import sys
+import math
 import json
+import stat
+import time
+import hashlib
+import tempfile
+from collections import OrderedDict, deque
+import joblib
+try:
+    import orjson
+except ImportError:
+    orjson = None
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, mean_absolute_error
+from sklearn.ensemble import HistGradientBoostingRegressor
 from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.tsa.stattools import adfuller
 import warnings
-warnings.filterwarnings('ignore')
 
-print("Step 0: Script started")
+def _default_cache_dir():
+    # A per-user location rather than a shared temp path, which another
+    # user could create first and fill with pickles of their own
+    base = (os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'saleforecast')
 
-def calculate_mape(y_true, y_pred):
-    y_true, y_pred = np.array(y_true), np.array(y_pred)
-    mask = y_true != 0
-    if mask.sum() == 0:
-        return 0
-    return np.mean(np.abs((y_true[mask] - y_pred[mask]) / y_true[mask])) * 100
+# Fitted models are persisted here so repeated runs on the same history
+# can skip fitting
+CACHE_DIR = os.environ.get('FORECAST_CACHE_DIR') or _default_cache_dir()
+
+# Entries unused for longer than this, or beyond the size budget (least
+# recently used first), are deleted after each write
+CACHE_MAX_AGE = 7 * 24 * 3600
+CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+# Column order of the matrix returned by create_features
+FEATURE_COLS = ['month', 'quarter', 'lag_1', 'lag_2', 'rolling_mean_3', 'rolling_std_3', 'promotion']
+
+# Below this many training periods the auto_arima order search is skipped
+ARIMA_SEARCH_MIN_POINTS = 30
+
+# Number of trailing in-sample periods used for the ARIMA error metrics
+METRICS_WINDOW = 64
+
+# Fitted models already loaded by this process, keyed like the disk cache
+# and kept in least-recently-used order. Only useful when the script is
+# kept alive with --serve; a few entries cover repeat requests without
+# letting a long-lived worker grow without limit.
+MODEL_CACHE_SIZE = 8
+_MODEL_CACHE = OrderedDict()
+
+def _remember_model(key, model):
+    _MODEL_CACHE[key] = model
+    _MODEL_CACHE.move_to_end(key)
+    while len(_MODEL_CACHE) > MODEL_CACHE_SIZE:
+        _MODEL_CACHE.popitem(last=False)
+
+def _is_private(path):
+    """True if path is ours and nobody else can write to it.
+
+    Cache entries are pickles, so loading one runs code; anything another
+    user could have planted or modified is not trusted.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if stat.S_ISLNK(st.st_mode):
+        return False
+    if not hasattr(os, 'getuid'):
+        # Windows: the per-user profile directory is private already
+        return True
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def load_cached_model(key):
+    model = _MODEL_CACHE.get(key)
+    if model is not None:
+        _MODEL_CACHE.move_to_end(key)
+        return model
+    path = os.path.join(CACHE_DIR, key + '.joblib')
+    if not os.path.exists(path) or not (_is_private(CACHE_DIR) and _is_private(path)):
+        return None
+    try:
+        model = joblib.load(path)
+        # Mark the entry as recently used for eviction
+        os.utime(path)
+    except Exception:
+        # A corrupt or incompatible cache entry is treated as a miss
+        return None
+    _remember_model(key, model)
+    return model
+
+def store_cached_model(key, model):
+    _remember_model(key, model)
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        if not _is_private(CACHE_DIR):
+            return
+        # Write to a private temporary file first so concurrent runs never
+        # load a half-written entry
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        os.close(fd)
+        try:
+            joblib.dump(model, tmp_path, compress=0)
+            os.replace(tmp_path, os.path.join(CACHE_DIR, key + '.joblib'))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        prune_cache()
+    except Exception:
+        # Caching is best effort; never fail the forecast over it
+        pass
+
+def prune_cache():
+    """Delete cache entries that are too old or over the size budget."""
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(('.joblib', '.tmp')):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    # Newest first, so the size budget is spent on recently used entries
+    entries.sort(reverse=True)
+    cutoff = time.time() - CACHE_MAX_AGE
+    total = 0
+    for mtime, size, path in entries:
+        total += size
+        if mtime < cutoff or total > CACHE_MAX_BYTES:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def fit_or_load_model(model, X, y, tag):
+    """Fit an unfitted sklearn estimator, or reuse a cached fit on the same data."""
+    key = hashlib.blake2b(
+        np.ascontiguousarray(X).tobytes()
+        + np.ascontiguousarray(y).tobytes()
+        + f'{tag}{sorted(model.get_params().items())}'.encode(),
+        digest_size=16,
+    ).hexdigest()
+    # Loaded through the same ownership checks as the ARIMA cache. Not
+    # memory-mapped: a mapped file could not be pruned on Windows, and
+    # repeat calls in one process are served from _MODEL_CACHE anyway.
+    cached = load_cached_model(key)
+    if cached is not None:
+        return cached
+    model.fit(X, y)
+    store_cached_model(key, model)
+    return model
+
+def _error_metrics_numpy(yt, yp):
+    resid = yt - yp
+    rmse = float(np.sqrt(np.dot(resid, resid) / resid.size))
+    abs_resid = np.abs(resid)
+    mae = float(abs_resid.mean())
+    nz = np.count_nonzero(yt)
+    if nz == 0:
+        return rmse, mae, 0.0
+    # Zero actuals contribute nothing; dividing by 1.0 there avoids
+    # boolean-indexed copies of both arrays
+    nonzero = yt != 0
+    ape = abs_resid / np.where(nonzero, np.abs(yt), 1.0)
+    mape = float(np.where(nonzero, ape, 0.0).sum() / nz * 100.0)
+    return rmse, mae, mape
+
+def _error_metrics_loop(yt, yp):
+    # Single-pass version of _error_metrics_numpy, written for numba
+    sq = 0.0
+    ab = 0.0
+    pct = 0.0
+    n_pct = 0
+    for i in range(yt.shape[0]):
+        v = yt[i]
+        r = v - yp[i]
+        sq += r * r
+        ab += abs(r)
+        if v != 0.0:
+            pct += abs(r / v)
+            n_pct += 1
+    n = yt.shape[0]
+    mape = 0.0 if n_pct == 0 else pct / n_pct * 100.0
+    return np.sqrt(sq / n), ab / n, mape
+
+_error_metrics = _error_metrics_numpy
+
+def use_numba_metrics():
+    """Compile the metrics kernel with numba, if it is installed.
+
+    Importing numba costs more than it saves for a single forecast, so
+    this is only worth calling in a long-lived process.
+    """
+    global _error_metrics
+    try:
+        from numba import njit
+    except ImportError:
+        return False
+    _error_metrics = njit(cache=True, fastmath=True)(_error_metrics_loop)
+    return True
+
+def calculate_metrics(y_true, y_pred):
+    """Return (rmse, mae, mape) for non-empty arrays, MAPE skipping zero actuals."""
+    y_true = np.ascontiguousarray(y_true, dtype=np.float64)
+    y_pred = np.ascontiguousarray(y_pred, dtype=np.float64)
+    return _error_metrics(y_true, y_pred)
 
 def detect_seasonality(series):
-    if len(series) < 4:
+    x = np.asarray(series, dtype=np.float64)
+    if len(x) < 4:
         return 'None'
-    result = adfuller(series)
-    is_stationary = result[1] < 0.05
-    return 'None' if is_stationary else 'Potential seasonality'
-
-def create_features(df, date_index=None):
-    df = df.copy()
-    if date_index is not None:
-        df.index = date_index
-    df['month'] = df.index.month
-    df['quarter'] = df.index.quarter
-    df['lag_1'] = df['totalAmount'].shift(1)
-    df['lag_2'] = df['totalAmount'].shift(2)
-    df['rolling_mean_3'] = df['totalAmount'].rolling(window=3).mean()
-    df['rolling_std_3'] = df['totalAmount'].rolling(window=3).std()
-    df['promotion'] = df['promotion'].astype(int)
-    return df
+    # Variance ratio as a cheap stationarity proxy: differencing a
+    # stationary series increases its variance, while a trending or
+    # seasonal level makes the differences much smoother than the series.
+    vr = np.var(np.diff(x)) / (np.var(x) + 1e-12)
+    return 'None' if vr > 0.5 else 'Potential seasonality'
 
-def main():
-    print("Step 1: Parsing input")
-    try:
-        sales_data = json.loads(sys.argv[1])
-        forecast_period = sys.argv[2]
-        model_type = sys.argv[3]
-        start_date = pd.to_datetime(sys.argv[4])
-        end_date = pd.to_datetime(sys.argv[5])
-    except Exception as e:
-        print(json.dumps({"error": f"Failed to parse arguments: {str(e)}"}), file=sys.stderr)
-        sys.exit(1)
+def create_features(amounts, promos, index):
+    """Build the model inputs for an aggregated series.
+
+    Returns an (N, len(FEATURE_COLS)) float64 matrix, with NaN where a lag
+    or rolling window reaches before the start of the series, and the
+    float64 target vector.
+    """
+    # Work on the raw float64 values; the series is short enough that
+    # pandas' shift/rolling overhead outweighs the actual arithmetic.
+    y = np.ascontiguousarray(amounts, dtype=np.float64)
+    n = len(y)
+    X = np.full((n, len(FEATURE_COLS)), np.nan)
+    X[:, 0] = index.month.to_numpy()
+    X[:, 1] = index.quarter.to_numpy()
+    X[1:, 2] = y[:-1]
+    X[2:, 3] = y[:-2]
+    if n >= 3:
+        windows = np.lib.stride_tricks.sliding_window_view(y, 3)
+        X[2:, 4] = windows.mean(axis=1)
+        X[2:, 5] = windows.std(axis=1, ddof=1)
+    X[:, 6] = promos
+    return X, y
 
-    print("Step 2: Creating DataFrame")
+class ForecastError(Exception):
+    """A forecasting step failed; the message is reported to the caller."""
+
+def run_forecast(sales_data, forecast_period, model_type, start_date, end_date, log=print):
+    log("Step 2: Creating DataFrame")
     try:
         df = pd.DataFrame(sales_data)
         if df.empty or 'date' not in df or 'totalAmount' not in df:
@@ -62,53 +258,55 @@ def main():
             raise ValueError("Invalid totalAmount: contains null or all zeros")
         df['promotion'] = df.get('promotion', False).astype(bool)
     except Exception as e:
-        print(json.dumps({"error": f"Data preparation error: {str(e)}"}), file=sys.stderr)
-        sys.exit(1)
+        raise ForecastError(f"Data preparation error: {str(e)}") from e
 
-    print("Step 3: Aggregate by period")
-    freq_map = {'Daily': 'D', 'Weekly': 'W', 'Monthly': 'M'}
-    freq = freq_map.get(forecast_period, 'M')
+    log("Step 3: Aggregate by period")
+    freq_map = {'Daily': 'D', 'Weekly': 'W', 'Monthly': 'ME'}
+    freq = freq_map.get(forecast_period, 'ME')
     try:
-        sales_series = df.groupby(df['date'].dt.to_period(freq))['totalAmount'].sum()
-        sales_series = sales_series.to_timestamp()
-        if sales_series.empty:
+        # Single pass over the data for both reductions
+        agg = df.set_index('date').resample(freq).agg(
+            totalAmount=('totalAmount', 'sum'),
+            promotion=('promotion', 'any'),
+        )
+        # Label each bucket by the start of its period, as before
+        index = agg.index.to_period().to_timestamp()
+        # The rest of the pipeline works on plain arrays
+        amounts = agg['totalAmount'].to_numpy(dtype=np.float64)
+        promos = agg['promotion'].to_numpy(dtype=np.bool_)
+        if amounts.size == 0:
             raise ValueError("No data after aggregation")
-        if (sales_series == 0).all():
+        if not amounts.any():
             raise ValueError("Aggregated series contains only zeros")
-        sales_df = pd.DataFrame({'totalAmount': sales_series}, index=sales_series.index)
-        sales_df['promotion'] = df.groupby(df['date'].dt.to_period(freq))['promotion'].any().to_timestamp()
     except Exception as e:
-        print(json.dumps({"error": f"Resampling error: {str(e)}"}), file=sys.stderr)
-        sys.exit(1)
+        raise ForecastError(f"Resampling error: {str(e)}") from e
 
-    print("Step 4: Extract features")
+    log("Step 4: Extract features")
     try:
-        seasonality = detect_seasonality(sales_series)
-        sales_df = create_features(sales_df)
+        seasonality = detect_seasonality(amounts)
+        X, y = create_features(amounts, promos, index)
         features = {
             'seasonality': seasonality,
-            'promotion': bool(sales_df['promotion'].any()),
-            'laggedSales': float(sales_df['lag_1'].iloc[-1]) if len(sales_df) > 1 else 0,
+            'promotion': bool(promos.any()),
+            'laggedSales': float(X[-1, 2]) if len(y) > 1 else 0,
             'economicTrend': 'Stable'
         }
     except Exception as e:
-        print(json.dumps({"error": f"Feature extraction error: {str(e)}"}), file=sys.stderr)
-        sys.exit(1)
+        raise ForecastError(f"Feature extraction error: {str(e)}") from e
 
-    print("Step 5: Train model and forecast")
+    log("Step 5: Train model and forecast")
     try:
-        if len(sales_df) < 3:
+        if len(y) < 3:
             # Require at least 3 points for any meaningful pattern
             raise ValueError("At least 3 data points required for forecasting")
 
         # Use all but the last point primarily for model fitting; we'll
         # compute metrics using in‑sample/backtested predictions to avoid
         # comparing forecasts for future periods with past actuals.
-        train = sales_df.iloc[:-1]
-        holdout = sales_df.iloc[-1:]
+        train_amounts = y[:-1]
 
         # Generate future dates - always start after the last historical period
-        last_date = sales_df.index.max()
+        last_date = index[-1]
         try:
             from pandas.tseries.frequencies import to_offset
             offset = to_offset(freq)
@@ -128,33 +326,60 @@ def main():
         if len(date_range) == 0:
             raise ValueError("Invalid date range: endDate must be after startDate and after the last available data point")
 
+        # Format all forecast dates once up front
+        date_strs = date_range.strftime('%Y-%m-%d').tolist()
         predictions = []
         metrics_y_true = None
         metrics_y_pred = None
         
         if model_type == 'ARIMA':
-            if len(train) < 3:
+            if len(train_amounts) < 3:
                 raise ValueError("ARIMA requires at least 3 data points")
-            try:
-                # Prefer auto_arima for better order selection and confidence intervals
-                from pmdarima import auto_arima
+            # Enable simple seasonality for Weekly / Monthly if enough history
+            seasonal = forecast_period in ['Weekly', 'Monthly'] and len(train_amounts) >= 12
+            m = 7 if forecast_period == 'Weekly' else (12 if forecast_period == 'Monthly' else 1)
 
-                # Enable simple seasonality for Weekly / Monthly if enough history
-                seasonal = forecast_period in ['Weekly', 'Monthly'] and len(train) >= 12
-                m = 7 if forecast_period == 'Weekly' else (12 if forecast_period == 'Monthly' else 1)
+            # The stepwise order search only pays off on longer histories;
+            # short series go straight to a fixed-order ARIMA fit
+            use_auto_arima = len(train_amounts) >= ARIMA_SEARCH_MIN_POINTS
+            if use_auto_arima:
+                try:
+                    # Prefer auto_arima for better order selection and confidence intervals
+                    from pmdarima import auto_arima
+                except ImportError:
+                    use_auto_arima = False
 
-                arima_model = auto_arima(
-                    train['totalAmount'],
+            if use_auto_arima:
+                search_params = dict(
                     seasonal=seasonal,
                     m=m,
                     max_p=3,
                     max_q=3,
                     max_d=2,
-                    trace=False,
-                    suppress_warnings=True,
-                    error_action='ignore',
+                    max_order=5,
+                    maxiter=25,
+                    method='lbfgs',
                     stepwise=True,
                 )
+                cache_key = hashlib.blake2b(
+                    train_amounts.tobytes()
+                    + f'{forecast_period}{sorted(search_params.items())}'.encode(),
+                    digest_size=16,
+                ).hexdigest()
+                arima_model = load_cached_model(cache_key)
+                if arima_model is None:
+                    # The order search fits many candidate models, most of
+                    # which warn; keep that noise off stderr
+                    with warnings.catch_warnings():
+                        warnings.simplefilter('ignore')
+                        arima_model = auto_arima(
+                            train_amounts,
+                            trace=False,
+                            suppress_warnings=True,
+                            error_action='ignore',
+                            **search_params,
+                        )
+                    store_cached_model(cache_key, arima_model)
 
                 # Use the fitted pmdarima model directly for forecasting
                 forecast, conf_int = arima_model.predict(
@@ -162,142 +387,177 @@ def main():
                     return_conf_int=True,
                     alpha=0.05,  # 95% interval
                 )
+                forecast = np.asarray(forecast)
 
                 # In‑sample predictions for metrics
                 try:
-                    insample_pred = arima_model.predict_in_sample()
-                    y_true = train['totalAmount'].values
-                    # Align last len(y_true) elements in case lengths differ slightly
-                    insample_pred = np.array(insample_pred)[-len(y_true):]
-                    y_true = y_true[-len(insample_pred):]
-                    if len(y_true) > 0:
+                    # Only the most recent periods are needed for the metrics.
+                    # pmdarima rejects a start inside the differencing window (start < d),
+                    # so short series still use the full in-sample range.
+                    metrics_start = len(train_amounts) - METRICS_WINDOW
+                    if metrics_start >= arima_model.order[1]:
+                        insample_pred = arima_model.predict_in_sample(
+                            start=metrics_start, end=len(train_amounts) - 1,
+                        )
+                    else:
+                        metrics_start = 0
+                        insample_pred = arima_model.predict_in_sample()
+                    insample_pred = np.asarray(insample_pred)
+                    y_true = train_amounts[metrics_start:]
+                    if len(y_true) > 0 and len(y_true) == len(insample_pred):
                         metrics_y_true = y_true
                         metrics_y_pred = insample_pred
                 except Exception:
                     # If in‑sample prediction fails, we'll fall back to zeros later
                     pass
 
-                for i, date in enumerate(date_range):
+                for i, date_str in enumerate(date_strs):
                     point = max(float(forecast[i]), 0.0)
                     lower = max(float(conf_int[i, 0]), 0.0)
                     upper = max(float(conf_int[i, 1]), 0.0)
                     predictions.append({
-                        'date': date.strftime('%Y-%m-%d'),
+                        'date': date_str,
                         'predictedSales': point,
                         # use 0‑100 scale to align with RandomForest
                         'confidenceLevel': 95.0,
                         'confidenceLower': lower,
                         'confidenceUpper': upper,
                     })
-            except ImportError:
-                # Fallback to a simple ARIMA(1,1,1) without auto_arima
-                fitted = ARIMA(train['totalAmount'], order=(1, 1, 1)).fit()
+            else:
+                # Fixed-order ARIMA, also used when pmdarima is unavailable
+                order = (0, 1, 1) if seasonal else (1, 1, 1)
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    fitted = ARIMA(train_amounts, order=order).fit()
                 forecast_res = fitted.get_forecast(steps=len(date_range))
-                mean_forecast = forecast_res.predicted_mean
-                conf_int = forecast_res.conf_int(alpha=0.05)
+                mean_forecast = np.asarray(forecast_res.predicted_mean)
+                conf_int = np.asarray(forecast_res.conf_int(alpha=0.05))
 
                 # In‑sample predictions for metrics from fitted values
                 try:
-                    fitted_vals = fitted.fittedvalues
-                    common_idx = train.index.intersection(fitted_vals.index)
-                    if len(common_idx) > 0:
-                        y_true = train.loc[common_idx, 'totalAmount'].values
-                        y_pred = fitted_vals.loc[common_idx].values
+                    y_pred = np.asarray(fitted.fittedvalues)[-METRICS_WINDOW:]
+                    if len(y_pred) > 0:
+                        y_true = train_amounts[-len(y_pred):]
                         metrics_y_true = y_true
                         metrics_y_pred = y_pred
                 except Exception:
                     pass
 
-                for i, date in enumerate(date_range):
-                    point = max(float(mean_forecast.iloc[i]), 0.0)
-                    lower = max(float(conf_int.iloc[i, 0]), 0.0)
-                    upper = max(float(conf_int.iloc[i, 1]), 0.0)
+                for i, date_str in enumerate(date_strs):
+                    point = max(float(mean_forecast[i]), 0.0)
+                    lower = max(float(conf_int[i, 0]), 0.0)
+                    upper = max(float(conf_int[i, 1]), 0.0)
                     predictions.append({
-                        'date': date.strftime('%Y-%m-%d'),
+                        'date': date_str,
                         'predictedSales': point,
                         'confidenceLevel': 95.0,
                         'confidenceLower': lower,
                         'confidenceUpper': upper,
                     })
         else:
-            feature_cols = ['month', 'quarter', 'lag_1', 'lag_2', 'rolling_mean_3', 'rolling_std_3', 'promotion']
-            X_train = train[feature_cols].fillna(0)
-            y_train = train['totalAmount']
-            if (y_train == 0).all():
+            # HistGradientBoosting works in float64 internally, so hand it
+            # contiguous float64 arrays and avoid any conversion copies.
+            # Fitting on a plain array also spares predict() the
+            # feature-name check on every forecast step.
+            X_train = np.nan_to_num(X[:-1], nan=0.0)
+            y_train = train_amounts
+            if not y_train.any():
                 raise ValueError("RandomForest training data contains only zeros")
-            model = RandomForestRegressor(
-                n_estimators=50,
-                max_depth=5,
-                min_samples_split=2,
+            # Histogram-based boosting is much cheaper to fit than a forest of
+            # independent trees. It is kept deliberately shallow and
+            # regularised: the confidence and metrics below are measured on
+            # the training data, and an unconstrained booster memorises it.
+            # The leaf size shrinks for very short series so they can still
+            # be split.
+            model = HistGradientBoostingRegressor(
+                max_iter=50,
+                max_depth=3,
+                learning_rate=0.1,
+                min_samples_leaf=max(2, min(5, len(y_train) // 4)),
+                l2_regularization=1.0,
                 random_state=42
             )
-            model.fit(X_train, y_train)
-            confidence = max(0, min(1, model.score(X_train, y_train))) * 100
+            model = fit_or_load_model(model, X_train, y_train, model_type)
+            y_pred_train = model.predict(X_train)
+
+            # R² on the training data, reusing the predictions above
+            train_var = np.var(y_train)
+            train_resid = y_train - y_pred_train
+            train_mse = np.dot(train_resid, train_resid) / train_resid.size
+            if train_var > 0:
+                r2 = 1 - train_mse / train_var
+            else:
+                r2 = 1.0 if train_mse == 0 else 0.0
+            confidence = max(0, min(1, r2)) * 100
 
             # Use training performance as a proxy for metrics
-            try:
-                y_pred_train = model.predict(X_train)
-                if len(y_pred_train) == len(y_train):
-                    metrics_y_true = y_train.values
-                    metrics_y_pred = y_pred_train
-            except Exception:
-                pass
+            if len(y_pred_train) == len(y_train):
+                metrics_y_true = y_train
+                metrics_y_pred = y_pred_train
 
-            # Prepare features for future predictions
-            current_df = sales_df.copy()
-            for date in date_range:
-                last_row = current_df.iloc[-1:].copy()
-                last_row.index = [date]
-                last_row['lag_1'] = current_df['totalAmount'].iloc[-1]
-                last_row['lag_2'] = current_df['lag_1'].iloc[-1] if len(current_df) > 1 else 0
-                last_row['rolling_mean_3'] = current_df['totalAmount'].rolling(window=3).mean().iloc[-1]
-                last_row['rolling_std_3'] = current_df['totalAmount'].rolling(window=3).std().iloc[-1]
-                last_row['month'] = date.month
-                last_row['quarter'] = date.quarter
-                last_row['promotion'] = current_df['promotion'].iloc[-1]
-                X_pred = last_row[feature_cols].fillna(0)
-                pred = max(model.predict(X_pred)[0], 0.0)
-                predictions.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'predictedSales': float(pred),
-                    'confidenceLevel': confidence
-                })
-                # Append prediction to current_df for next iteration
-                new_row = pd.DataFrame({
-                    'totalAmount': [pred],
-                    'promotion': [last_row['promotion'].iloc[0]],
-                    'month': [date.month],
-                    'quarter': [date.quarter],
-                    'lag_1': [last_row['totalAmount'].iloc[0]],
-                    'lag_2': [last_row['lag_1'].iloc[0]],
-                    'rolling_mean_3': [current_df['totalAmount'].rolling(window=3).mean().iloc[-1] if len(current_df) >= 3 else pred],
-                    'rolling_std_3': [current_df['totalAmount'].rolling(window=3).std().iloc[-1] if len(current_df) >= 3 else 0],
-                }, index=[date])
-                current_df = pd.concat([current_df, new_row])
+            # Prepare features for future predictions. Only the last three
+            # amounts are needed for the lag and rolling features, so keep
+            # them in a small buffer instead of growing a DataFrame.
+            buf = deque(y[-3:].tolist(), maxlen=3)
+            last_amount = buf[-1]
+            prev_amount = buf[-2] if len(buf) > 1 else 0
+            last_promo = int(promos[-1])
+            # Running sum and sum of squares of the buffer give the rolling
+            # mean/std in O(1) per step
+            s1 = sum(buf)
+            s2 = sum(v * v for v in buf)
+            # One reusable feature row, filled in place each step
+            row = np.empty((1, len(FEATURE_COLS)), dtype=np.float64)
+            months = date_range.month.to_numpy()
+            quarters = date_range.quarter.to_numpy()
+            pred_arr = np.empty(len(date_range), dtype=np.float64)
+            for i in range(len(date_range)):
+                n = len(buf)
+                rolling_mean = s1 / n
+                if n > 1:
+                    var = max(s2 / n - rolling_mean * rolling_mean, 0.0)
+                    rolling_std = math.sqrt(var * n / (n - 1))
+                else:
+                    rolling_std = 0.0
+                row[0] = (months[i], quarters[i], last_amount, prev_amount,
+                          rolling_mean, rolling_std, last_promo)
+                pred = max(float(model.predict(row)[0]), 0.0)
+                pred_arr[i] = pred
+                # Feed the prediction back in for the next iteration
+                prev_amount = last_amount
+                last_amount = pred
+                if len(buf) == buf.maxlen:
+                    old = buf[0]
+                    s1 -= old
+                    s2 -= old * old
+                buf.append(pred)
+                s1 += pred
+                s2 += pred * pred
+
+            predictions = [
+                {'date': d, 'predictedSales': p, 'confidenceLevel': confidence}
+                for d, p in zip(date_strs, pred_arr.tolist())
+            ]
 
     except Exception as e:
-        print(json.dumps({"error": f"Model training error: {str(e)}"}), file=sys.stderr)
-        sys.exit(1)
+        raise ForecastError(f"Model training error: {str(e)}") from e
 
-    print("Step 6: Calculate metrics")
+    log("Step 6: Calculate metrics")
     try:
         if metrics_y_true is not None and metrics_y_pred is not None:
-            y_true_arr = np.array(metrics_y_true, dtype=float)
-            y_pred_arr = np.array(metrics_y_pred, dtype=float)
+            y_true_arr = np.asarray(metrics_y_true, dtype=np.float64)
+            y_pred_arr = np.asarray(metrics_y_pred, dtype=np.float64)
             # Guard against degenerate cases
-            if len(y_true_arr) > 0 and not np.all(y_true_arr == 0):
-                rmse = np.sqrt(mean_squared_error(y_true_arr, y_pred_arr))
-                mae = mean_absolute_error(y_true_arr, y_pred_arr)
-                mape = calculate_mape(y_true_arr, y_pred_arr)
+            if y_true_arr.size and y_true_arr.any():
+                rmse, mae, mape = calculate_metrics(y_true_arr, y_pred_arr)
             else:
                 rmse = mae = mape = 0
         else:
             rmse = mae = mape = 0
     except Exception as e:
-        print(json.dumps({"error": f"Metric calculation error: {str(e)}"}), file=sys.stderr)
-        sys.exit(1)
+        raise ForecastError(f"Metric calculation error: {str(e)}") from e
 
-    print("Step 7: Return result")
+    log("Step 7: Return result")
     result = {
         'predictions': predictions,
         'features': {
@@ -312,13 +572,78 @@ def main():
             'mape': float(mape)
         }
     }
+    return result
+
+def emit_result(result):
     # Flush stdout to ensure output is sent immediately
-    print(json.dumps(result), flush=True)
-    sys.stdout.flush()
+    if orjson is not None:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n')
+        sys.stdout.buffer.flush()
+    else:
+        print(json.dumps(result), flush=True)
+        sys.stdout.flush()
+
+def main():
+    print("Step 0: Script started")
+    print("Step 1: Parsing input")
+    try:
+        sales_data = json.loads(sys.argv[1])
+        forecast_period = sys.argv[2]
+        model_type = sys.argv[3]
+        start_date = pd.to_datetime(sys.argv[4])
+        end_date = pd.to_datetime(sys.argv[5])
+    except Exception as e:
+        print(json.dumps({"error": f"Failed to parse arguments: {str(e)}"}), file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        result = run_forecast(sales_data, forecast_period, model_type, start_date, end_date)
+    except ForecastError as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(1)
+    emit_result(result)
+
+def serve():
+    """Answer forecast requests sent as JSON lines on stdin until EOF.
+
+    Each request carries salesData, forecastPeriod, modelType, startDate
+    and endDate; each reply is written as a single JSON line on stdout.
+    Progress messages go to stderr, so stdout carries nothing but replies.
+    Keeping the process alive lets fitted models stay in _MODEL_CACHE.
+    """
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    use_numba_metrics()
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            sales_data = request['salesData']
+            forecast_period = request['forecastPeriod']
+            model_type = request['modelType']
+            start_date = pd.to_datetime(request['startDate'])
+            end_date = pd.to_datetime(request['endDate'])
+        except Exception as e:
+            emit_result({"error": f"Failed to parse request: {str(e)}"})
+            continue
+        try:
+            result = run_forecast(sales_data, forecast_period, model_type, start_date, end_date, log=log)
+        except ForecastError as e:
+            result = {"error": str(e)}
+        except Exception as e:
+            result = {"error": str(e), "type": type(e).__name__}
+        emit_result(result)
 
 if __name__ == '__main__':
     try:
-        main()
+        if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+            serve()
+        else:
+            main()
     except Exception as e:
         print(json.dumps({"error": str(e), "type": type(e).__name__}), file=sys.stderr)
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,78 @@
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+import forecast
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / 'cache'
+    monkeypatch.setattr(forecast, 'CACHE_DIR', str(path))
+    monkeypatch.setattr(forecast, '_MODEL_CACHE', OrderedDict())
+    return path
+
+
+def test_round_trip(cache_dir):
+    forecast.store_cached_model('abc', {'order': (1, 1, 1)})
+    forecast._MODEL_CACHE.clear()
+    assert forecast.load_cached_model('abc') == {'order': (1, 1, 1)}
+    assert oct(cache_dir.stat().st_mode & 0o777) == oct(0o700)
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX permissions only')
+def test_shared_directory_is_not_trusted(cache_dir):
+    forecast.store_cached_model('abc', {'order': (1, 1, 1)})
+    forecast._MODEL_CACHE.clear()
+    os.chmod(cache_dir, 0o777)
+    assert forecast.load_cached_model('abc') is None
+
+
+def test_in_memory_cache_is_bounded(cache_dir, monkeypatch):
+    monkeypatch.setattr(forecast, 'MODEL_CACHE_SIZE', 2)
+    forecast.store_cached_model('a', 1)
+    forecast.store_cached_model('b', 2)
+    forecast.load_cached_model('a')
+    forecast.store_cached_model('c', 3)
+    # 'b' was least recently used
+    assert list(forecast._MODEL_CACHE) == ['a', 'c']
+
+
+def test_prune_drops_stale_and_oversized_entries(cache_dir, monkeypatch):
+    cache_dir.mkdir(mode=0o700)
+    now = time.time()
+    for i, name in enumerate(['new', 'mid', 'old']):
+        path = cache_dir / (name + '.joblib')
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (now - i * 60, now - i * 60))
+    stale = cache_dir / 'stale.joblib'
+    stale.write_bytes(b'x')
+    os.utime(stale, (now - forecast.CACHE_MAX_AGE - 1,) * 2)
+
+    monkeypatch.setattr(forecast, 'CACHE_MAX_BYTES', 250)
+    forecast.prune_cache()
+
+    assert sorted(os.listdir(cache_dir)) == ['mid.joblib', 'new.joblib']
+
+
+def test_fit_or_load_model_reuses_trusted_fit(cache_dir):
+    X = np.arange(40, dtype=np.float64).reshape(20, 2)
+    y = X.sum(axis=1)
+    params = dict(max_iter=5, min_samples_leaf=2, random_state=0)
+
+    first = forecast.fit_or_load_model(HistGradientBoostingRegressor(**params), X, y, 'RandomForest')
+    forecast._MODEL_CACHE.clear()
+    second = forecast.fit_or_load_model(HistGradientBoostingRegressor(**params), X, y, 'RandomForest')
+    assert second is not first
+    np.testing.assert_array_equal(first.predict(X), second.predict(X))
+
+    if hasattr(os, 'getuid'):
+        # An untrusted directory is ignored and the model is refitted
+        os.chmod(cache_dir, 0o777)
+        forecast._MODEL_CACHE.clear()
+        fresh = HistGradientBoostingRegressor(**params)
+        assert forecast.fit_or_load_model(fresh, X, y, 'RandomForest') is fresh
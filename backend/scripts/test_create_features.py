@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecast
+
+
+def pandas_features(amounts, promos, index):
+    # The shift/rolling implementation create_features replaced
+    df = pd.DataFrame({'totalAmount': amounts, 'promotion': promos}, index=index)
+    df['month'] = df.index.month
+    df['quarter'] = df.index.quarter
+    df['lag_1'] = df['totalAmount'].shift(1)
+    df['lag_2'] = df['totalAmount'].shift(2)
+    df['rolling_mean_3'] = df['totalAmount'].rolling(window=3).mean()
+    df['rolling_std_3'] = df['totalAmount'].rolling(window=3).std()
+    df['promotion'] = df['promotion'].astype(int)
+    return df[forecast.FEATURE_COLS].to_numpy(dtype=np.float64)
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 4, 14])
+@pytest.mark.parametrize('freq', ['D', 'W', 'MS'])
+def test_matches_pandas_shift_and_rolling(n, freq):
+    rng = np.random.default_rng(n)
+    amounts = rng.uniform(500, 2000, n)
+    promos = rng.random(n) < 0.4
+    index = pd.date_range('2023-11-20', periods=n, freq=freq)
+
+    X, y = forecast.create_features(amounts, promos, index)
+
+    assert X.shape == (n, len(forecast.FEATURE_COLS))
+    assert X.dtype == np.float64
+    np.testing.assert_array_equal(y, amounts)
+    np.testing.assert_allclose(X, pandas_features(amounts, promos, index), rtol=1e-12, equal_nan=True)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import forecast
+
+CASES = [
+    ([1200.0, 1350.5, 990.0, 1500.25], [1180.0, 1400.0, 1010.5, 1455.0]),
+    # Zero actuals are left out of MAPE but still count for RMSE/MAE
+    ([100.0, 0.0, 50.0, 200.0], [90.0, 5.0, 60.0, 100.0]),
+    ([0.0, 0.0], [1.0, 2.0]),
+    ([42.0], [40.0]),
+]
+
+
+def reference_metrics(y_true, y_pred):
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    resid = y_true - y_pred
+    nonzero = y_true != 0
+    mape = np.mean(np.abs(resid[nonzero] / y_true[nonzero])) * 100 if nonzero.any() else 0.0
+    return np.sqrt(np.mean(resid ** 2)), np.mean(np.abs(resid)), mape
+
+
+def kernels():
+    yield 'numpy', forecast._error_metrics_numpy
+    yield 'loop', forecast._error_metrics_loop
+    try:
+        from numba import njit
+    except ImportError:
+        return
+    # Same flags as use_numba_metrics
+    yield 'numba', njit(fastmath=True)(forecast._error_metrics_loop)
+
+
+@pytest.mark.parametrize('y_true, y_pred', CASES)
+def test_metric_kernels_agree(y_true, y_pred):
+    expected = reference_metrics(y_true, y_pred)
+    yt = np.ascontiguousarray(y_true, dtype=np.float64)
+    yp = np.ascontiguousarray(y_pred, dtype=np.float64)
+    for name, kernel in kernels():
+        np.testing.assert_allclose(kernel(yt, yp), expected, rtol=1e-12, err_msg=name)
+
+
+def test_calculate_metrics_accepts_lists():
+    rmse, mae, mape = forecast.calculate_metrics([100, 0, 50, 200], [90, 5, 60, 100])
+    assert mae == pytest.approx(31.25)
+    assert mape == pytest.approx(26.666666666666668)
+    assert rmse == pytest.approx(np.sqrt(np.mean([100, 25, 100, 10000])))
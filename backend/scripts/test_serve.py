@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'forecast.py')
+
+SALES = [
+    {"date": f"2024-01-{day:02d}", "totalAmount": 1000 + day * 37 % 11 * 20, "promotion": day % 3 == 0}
+    for day in range(1, 31)
+]
+
+
+def make_request(model_type, end_date):
+    return json.dumps({
+        'salesData': SALES,
+        'forecastPeriod': 'Daily',
+        'modelType': model_type,
+        'startDate': '2024-02-01',
+        'endDate': end_date,
+    })
+
+
+def test_serve_writes_one_json_line_per_request(tmp_path):
+    requests = [make_request('RandomForest', '2024-02-05'), make_request('ARIMA', '2024-02-03')]
+    proc = subprocess.run(
+        [sys.executable, SCRIPT, '--serve'],
+        input='\n'.join(requests) + '\n',
+        capture_output=True,
+        text=True,
+        timeout=120,
+        env={**os.environ, 'FORECAST_CACHE_DIR': str(tmp_path)},
+    )
+    assert proc.returncode == 0, proc.stderr
+
+    lines = proc.stdout.splitlines()
+    assert len(lines) == 2
+    replies = [json.loads(line) for line in lines]
+    assert [len(r['predictions']) for r in replies] == [5, 3]
+    # Progress messages are kept off the reply channel
+    assert 'Step 2: Creating DataFrame' in proc.stderr